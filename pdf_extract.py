@@ -0,0 +1,235 @@
+import os
+import re
+import mmap
+import json
+import hashlib
+import time
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import wait
+import pandas as pd
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from pypdf import PdfReader
+
+# Settings for the extraction stage
+pdf_dir = '.'  # Folder holding the downloaded PDFs (print_url_trial.py saves paper.pdf here)
+skip_dirs = {'venv', '__pycache__', 'node_modules'}  # Hidden folders (.git, .venv, ...) are skipped as well
+cache_file = 'pdf_extract_cache.json'  # Small per-hash metadata (page count, DOI, error)
+text_dir = 'pdf_text'  # Full text is kept here as <sha256>.txt, one file per PDF
+output_file = 'pdf_extract_output.xlsx'
+num_workers = os.cpu_count() or 1
+timeout_seconds = 60  # Per-file limit, a broken PDF should not stall the whole run
+retry_timeouts = False  # Set to True to re-extract files that timed out or crashed on an earlier run
+save_every = 25  # Write the cache to disk after this many new results
+doi_pages = 2  # Only the first pages are searched for a DOI
+
+doi_pattern = re.compile(r'\b(10\.\d{4,9}/[^\s"]+)', re.IGNORECASE)  # SICI DOIs can contain < and >
+
+# Helper function: hash a file through a memory map so large PDFs are not read into memory
+def hash_file(path):
+    if os.path.getsize(path) == 0:
+        return hashlib.sha256(b'').hexdigest()
+    with open(path, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return hashlib.sha256(mm).hexdigest()
+
+# Helper function: find a DOI in a piece of text
+def find_doi(text):
+    if not text:
+        return None
+    match = doi_pattern.search(text)
+    if match is None:
+        return None
+    doi = match.group(1)
+    # Trailing punctuation is usually part of the sentence, not the DOI.
+    # A closing bracket is only dropped when the DOI has no opening bracket for it,
+    # so forms like 10.1002/(SICI)... keep their brackets.
+    brackets = {')': '(', ']': '[', '}': '{'}
+    while doi and doi[-1] in '.,;)]}':
+        last = doi[-1]
+        if last in brackets and doi.count(brackets[last]) >= doi.count(last):
+            break
+        doi = doi[:-1]
+    return doi
+
+# Worker function: pull text, page count and DOI out of one PDF
+def extract_pdf(path):
+    with open(path, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            reader = PdfReader(mm)
+            page_texts = [page.extract_text() or "" for page in reader.pages]
+
+            # Check the document metadata first, then fall back to the first pages
+            doi = None
+            metadata = reader.metadata or {}
+            for key in ('/doi', '/DOI', '/Subject', '/Title', '/Keywords'):
+                doi = find_doi(str(metadata.get(key, "")))
+                if doi:
+                    break
+            if doi is None:
+                doi = find_doi("\n".join(page_texts[:doi_pages]))
+
+    return {
+        'page count': len(page_texts),
+        'doi': doi,
+        'text': "\n".join(page_texts),
+    }
+
+# Helper function: where the full text of a PDF with this hash is stored
+def text_path(file_hash):
+    return os.path.join(text_dir, f"{file_hash}.txt")
+
+# Child process entry point: write the text to its own file and send only the
+# metadata (or the error) back to the parent
+def extract_worker(path, file_hash, conn):
+    try:
+        result = extract_pdf(path)
+        text = result.pop('text')
+        os.makedirs(text_dir, exist_ok=True)
+        temp_path = f"{text_path(file_hash)}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            file.write(text)
+        os.replace(temp_path, text_path(file_hash))
+        result['has text'] = bool(text.strip())
+    except Exception as e:
+        result = {'error': f"{type(e).__name__}: {e}"}
+    conn.send(result)
+    conn.close()
+
+# Load metadata from earlier runs, keyed by file hash
+def load_cache(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except ValueError:
+        print(f"Cache file {path} is corrupt, starting with an empty cache")
+        return {}
+
+# Write to a temp file first so an interrupted save never leaves a broken cache behind
+def save_cache(cache, path):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(cache, file)
+    os.replace(temp_path, path)
+
+# Run the extraction over every PDF, skipping files whose hash is already cached.
+# Each file gets its own process so one that runs past the timeout can be killed
+# without holding up the files behind it.
+def extract_pdfs(pdf_paths, cache, cache_path=cache_file):
+    file_hashes = {}
+    for path in pdf_paths:
+        try:
+            file_hashes[path] = hash_file(path)
+        except OSError as e:
+            print(f"Failed to read {path}: {e}")
+
+    # Queue each distinct file content once, copies of the same PDF share one result
+    pending = deque()
+    seen_hashes = set()
+    for path, file_hash in file_hashes.items():
+        if file_hash in seen_hashes:
+            continue
+        seen_hashes.add(file_hash)
+        cached = cache.get(file_hash)
+        if cached is None or (retry_timeouts and cached.get('retry')):
+            pending.append((path, file_hash))
+    print(f"{len(seen_hashes) - len(pending)} PDFs cached, {len(pending)} to extract")
+
+    running = {}  # reading end of the worker's pipe -> (path, hash, process, start time)
+    unsaved = 0
+
+    def record(path, file_hash, result):
+        nonlocal unsaved
+        if 'error' in result:
+            print(f"Failed to extract {path}: {result['error']}")
+        cache[file_hash] = result
+        unsaved += 1
+        if unsaved >= save_every:
+            save_cache(cache, cache_path)
+            unsaved = 0
+
+    try:
+        while pending or running:
+            # Start new files while there are free workers, the timer starts here
+            while pending and len(running) < num_workers:
+                path, file_hash = pending.popleft()
+                reader, writer = multiprocessing.Pipe(duplex=False)
+                process = multiprocessing.Process(target=extract_worker, args=(path, file_hash, writer))
+                process.start()
+                writer.close()
+                running[reader] = (path, file_hash, process, time.monotonic())
+
+            # Collect finished results, a worker that died without sending one shows up as EOF
+            for reader in wait(list(running), timeout=0.1):
+                path, file_hash, process, _ = running.pop(reader)
+                try:
+                    result = reader.recv()
+                except EOFError:
+                    result = None
+                process.join()
+                reader.close()
+                if result is None:
+                    # A crash may come from load on this machine, so mark it for retry_timeouts
+                    result = {'error': f"Worker exited with code {process.exitcode}", 'retry': True}
+                record(path, file_hash, result)
+
+            # Kill and replace workers that ran past the limit
+            now = time.monotonic()
+            for reader, (path, file_hash, process, started) in list(running.items()):
+                if now - started > timeout_seconds:
+                    process.terminate()
+                    process.join()
+                    reader.close()
+                    del running[reader]
+                    record(path, file_hash, {'error': f"Timed out after {timeout_seconds} seconds", 'retry': True})
+    finally:
+        # Make sure no worker outlives the run, and keep what was finished
+        for reader, (_, _, process, _) in running.items():
+            process.terminate()
+            process.join()
+            reader.close()
+        save_cache(cache, cache_path)
+
+    # Excel caps a cell at 32767 characters, so only that much text is read back for the sheet
+    rows = []
+    for path, file_hash in file_hashes.items():
+        result = cache.get(file_hash)
+        if result is None:
+            continue
+        text = ""
+        if result.get('has text'):
+            try:
+                with open(text_path(file_hash), 'r', encoding='utf-8') as file:
+                    text = file.read(32767)
+            except OSError as e:
+                print(f"Failed to read text for {path}: {e}")
+        rows.append({
+            'file': path,
+            'sha256': file_hash,
+            'page count': result.get('page count'),
+            'doi': result.get('doi'),
+            'has text': result.get('has text', False),
+            'text': text,
+            'error': result.get('error'),
+        })
+    return pd.DataFrame(rows, columns=['file', 'sha256', 'page count', 'doi', 'has text', 'text', 'error'])
+
+if __name__ == '__main__':
+    pdf_paths = []
+    for root, dirs, names in os.walk(pdf_dir):
+        # Prune hidden and virtualenv folders so package PDFs are not picked up
+        dirs[:] = [d for d in dirs if not d.startswith('.') and d not in skip_dirs]
+        pdf_paths.extend(os.path.join(root, name) for name in names if name.lower().endswith('.pdf'))
+    pdf_paths.sort()
+
+    cache = load_cache(cache_file)
+    pdf_df = extract_pdfs(pdf_paths, cache)
+
+    # PDF text often holds control characters that openpyxl refuses to write
+    for column in ('file', 'doi', 'text', 'error'):
+        pdf_df[column] = pdf_df[column].str.replace(ILLEGAL_CHARACTERS_RE, '', regex=True)
+    pdf_df.to_excel(output_file, index=False)
+    print(f"Processed {len(pdf_df)} PDFs, {pdf_df['has text'].sum()} with full text, "
+          f"{pdf_df['error'].notna().sum()} failed. Saved to '{output_file}'.")